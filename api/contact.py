@@ -1,90 +1,366 @@
+from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler
-import json
 import os
-import smtplib
 from email.message import EmailMessage
 from email.utils import formataddr
-import requests
+import http.client
+import urllib.parse
 import re
+import string
 import logging
 import textwrap
 import html
-from datetime import datetime, timezone
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+# Configure logging. Output goes to the runtime's root handlers, or to stderr
+# via logging.lastResort (WARNING and above) if the runtime set none up.
 logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Configuration, resolved once per cold start
+REQUIRED_ENV = ("EMAIL_FROM", "EMAIL_TO", "EMAIL_PASSWORD", "RECAPTCHA_SECRET")
+if missing := [var for var in REQUIRED_ENV if not os.environ.get(var)]:
+    raise RuntimeError(f"Missing environment variables: {', '.join(missing)}")
+EMAIL_FROM = os.environ["EMAIL_FROM"]
+EMAIL_TO = os.environ["EMAIL_TO"]
+EMAIL_PASSWORD = os.environ["EMAIL_PASSWORD"]
+RECAPTCHA_SECRET = os.environ["RECAPTCHA_SECRET"]
+SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 465))
+SMTP_TIMEOUT = int(os.environ.get("SMTP_TIMEOUT", 10))
+USE_EMAIL_REGEX = os.environ.get("USE_EMAIL_REGEX") == "1"
+INCLUDE_HTML = os.environ.get("INCLUDE_HTML", "1") == "1"
+# Only enable where the runtime keeps running after the response is sent
+ASYNC_SEND = os.environ.get("ASYNC_SEND") == "1"
 
 # Constants
 MAX_CONTENT_LENGTH = 10240  # 10KB
-EMAIL_REGEX = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
-ALLOWED_ORIGINS = [
-    "https://www.satyadahal.com.np",
-    "https://satyadahal.com.np",
-    # "http://localhost:3000"
-]
+EMAIL_RE = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$", re.ASCII)
+EMAIL_LOCAL_CHARS = frozenset(string.ascii_letters + string.digits + "_.+-")
+EMAIL_DOMAIN_CHARS = frozenset(string.ascii_letters + string.digits + "-.")
+HTML_MIN_MESSAGE_LENGTH = 200  # Shorter messages are sent as plain text only
+MAX_QUEUED_SENDS = 64
+# html.escape() plus newline-to-<br> in a single pass
+HTML_MESSAGE_TABLE = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "'": "&#x27;",
+        "\n": "<br>",
+    }
+)
+ALLOWED_ORIGINS = frozenset(
+    {
+        "https://www.satyadahal.com.np",
+        "https://satyadahal.com.np",
+        # "http://localhost:3000"
+    }
+)
 ALLOWED_ENDPOINT = "/api/contact"
 
+# Email templates
+PLAIN_TEMPLATE = textwrap.dedent(
+    """\
+    🚀 New Message From Your Portfolio Site
+
+    ⏰ Received at: {timestamp}
+
+    👤 Contact Details:
+      • Name: {name}
+      • Email: {email}
+
+    📝 Message:
+    {message}
+
+    ---
+    🤖 Automated Notification - Do not reply directly to this email.
+    """
+)
+HTML_TEMPLATE = textwrap.dedent(
+    """\
+    <html>
+      <body>
+        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+          <h2 style="color: #2563eb;">🚀 New Message From Portfolio Site</h2>
+          <div style="background-color: #f3f4f6; padding: 16px; border-radius: 8px; margin-bottom: 24px;">
+            <p><strong>Received at:</strong> {timestamp}</p>
+            <h3 style="color: #4b5563; margin-top: 20px;">Contact Details</h3>
+            <ul>
+              <li><strong>Name:</strong> {safe_name}</li>
+              <li><strong>Email:</strong> <a href="mailto:{safe_email}">{safe_email}</a></li>
+            </ul>
+            <h3 style="color: #4b5563; margin-top: 20px;">📝 Message</h3>
+            <div style="white-space: pre-wrap; background: white; padding: 12px; border-radius: 4px;">
+              {safe_message}
+            </div>
+          </div>
+          <div style="font-size: 12px; color: #6b7280; text-align: center; padding-top: 16px; border-top: 1px solid #e5e7eb;">
+            <p>🔒 This message was sent securely via your portfolio contact form</p>
+            <p>🤖 Automated Notification - Do not reply directly to this email</p>
+          </div>
+        </div>
+      </body>
+    </html>
+    """
+)
+
+# Keep-alive connections for reCAPTCHA verification. Checks run on the request
+# threads, each taking an idle connection or opening its own; at most
+# RECAPTCHA_POOL_SIZE idle connections are kept for reuse afterwards.
+RECAPTCHA_HOST = "www.google.com"
+RECAPTCHA_VERIFY_PATH = "/recaptcha/api/siteverify"
+RECAPTCHA_POOL_SIZE = 4
+_recaptcha_idle = queue.LifoQueue(maxsize=RECAPTCHA_POOL_SIZE)
+_tls_lock = threading.Lock()
+_tls_context = None  # Created on first use; building the TLS context is slow
+
+# Persistent SMTP connection shared across requests
+_smtp_lock = threading.RLock()
+_smtp_conn = None
+
+# Sets up the SMTP connection while the request thread verifies reCAPTCHA.
+# One worker is enough: warm-ups serialize on _smtp_lock anyway.
+_smtp_warmup = ThreadPoolExecutor(max_workers=1)
+
+# Background email delivery when ASYNC_SEND is enabled
+_send_executor = ThreadPoolExecutor(max_workers=2)
+_send_slots = threading.BoundedSemaphore(MAX_QUEUED_SENDS)
+
 
 def is_origin_allowed(origin):
     """Check if the request origin is allowed"""
-    if not origin:
-        return False
     return origin in ALLOWED_ORIGINS
 
 
+def _build_cors_headers(status_code, origin):
+    """Serialize the status line and CORS headers for one response variant"""
+    lines = [
+        f"{BaseHTTPRequestHandler.protocol_version} {status_code} "
+        f"{HTTPStatus(status_code).phrase}"
+    ]
+    if origin:
+        lines += [f"Access-Control-Allow-Origin: {origin}", "Vary: Origin"]
+    lines.append("Content-Type: text/plain")
+    if status_code == 200:
+        lines += [
+            "Access-Control-Allow-Methods: POST, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+        ]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+# Prebuilt response headers keyed by (status code, allowed origin or None)
+_CORS_HEADERS = {
+    (status_code, origin): _build_cors_headers(status_code, origin)
+    for status_code in (200, 202, 400, 403, 413, 500)
+    for origin in (None, *ALLOWED_ORIGINS)
+}
+_NOT_FOUND_RESPONSE = _build_cors_headers(404, None) + b"Not Found"
+
+
+def is_valid_email(email):
+    """Check an email address against the same grammar as EMAIL_RE"""
+    if USE_EMAIL_REGEX:
+        return EMAIL_RE.match(email) is not None
+    local, _, domain = email.rpartition("@")
+    label, _, rest = domain.partition(".")
+    return bool(
+        local
+        and label
+        and rest
+        and EMAIL_LOCAL_CHARS.issuperset(local)
+        and EMAIL_DOMAIN_CHARS.issuperset(domain)
+    )
+
+
+def _get_smtp():
+    """Return the shared SMTP connection, reconnecting if it has gone stale"""
+    import smtplib
+
+    global _smtp_conn
+    with _smtp_lock:
+        if _smtp_conn is not None:
+            try:
+                if _smtp_conn.noop()[0] == 250:
+                    return _smtp_conn
+            except OSError:  # Includes smtplib.SMTPException
+                pass
+            _close_smtp()
+
+        smtp = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+        try:
+            smtp.login(EMAIL_FROM, EMAIL_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        logger.info("Connected to SMTP server %s:%s", SMTP_SERVER, SMTP_PORT)
+        _smtp_conn = smtp
+        return smtp
+
+
+def _close_smtp(smtp=None):
+    """Close an SMTP connection (the shared one by default), unsharing it if needed"""
+    global _smtp_conn
+    with _smtp_lock:
+        smtp = smtp or _smtp_conn
+        if smtp is None:
+            return
+        try:
+            smtp.close()
+        except OSError:
+            pass
+        if smtp is _smtp_conn:
+            _smtp_conn = None
+
+
+def _new_siteverify_conn():
+    """Create a siteverify connection sharing one TLS context"""
+    global _tls_context
+    with _tls_lock:
+        if _tls_context is None:
+            import ssl
+
+            _tls_context = ssl.create_default_context()
+    return http.client.HTTPSConnection(
+        RECAPTCHA_HOST, 443, timeout=3, context=_tls_context
+    )
+
+
+def _post_siteverify(body):
+    """POST a form body to siteverify, reconnecting once if the connection went stale"""
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    try:
+        conn = _recaptcha_idle.get_nowait()
+    except queue.Empty:
+        conn = _new_siteverify_conn()
+
+    for attempt in range(2):
+        try:
+            conn.request("POST", RECAPTCHA_VERIFY_PATH, body, headers)
+            response = conn.getresponse()
+            result = response.status, response.read()
+            break
+        except ConnectionError:
+            conn.close()
+            if attempt:
+                raise
+        except Exception:
+            conn.close()
+            raise
+
+    # Keep the connection alive for the next check unless the pool is full
+    try:
+        _recaptcha_idle.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+    return result
+
+
+def _queue_send(send, *args):
+    """Run send(*args) in the background, returning False if the queue is full"""
+    if not _send_slots.acquire(blocking=False):
+        return False
+    _send_executor.submit(send, *args).add_done_callback(_finish_send)
+    return True
+
+
+def _finish_send(future):
+    """Free the queue slot of a background send and log any failure"""
+    _send_slots.release()
+    if error := future.exception():
+        logger.error("Queued email sending failed", exc_info=error)
+    else:
+        logger.info("Queued email sent")
+
+
+def _send_message(msg, smtp=None):
+    """Send a message over the shared SMTP connection, retrying once if it dropped"""
+    import smtplib
+
+    with _smtp_lock:
+        smtp = smtp or _get_smtp()
+        try:
+            try:
+                smtp.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Only retry when the server went away; timeouts and 5xx replies
+                # could mean a duplicate delivery or would just fail again
+                logger.warning("SMTP connection lost, reconnecting")
+                _close_smtp(smtp)
+                smtp = _get_smtp()
+                smtp.send_message(msg)
+        except OSError:
+            # The session may be mid-transaction; don't hand it to the next send
+            _close_smtp(smtp)
+            raise
+
+
 class handler(BaseHTTPRequestHandler):
-    def send_cors_headers(self, origin, status_code=200):
-        """Send CORS headers with proper origin validation"""
-        self.send_response(status_code)
-        if origin and is_origin_allowed(origin):
-            self.send_header("Access-Control-Allow-Origin", origin)
-            self.send_header("Vary", "Origin")
-        self.send_header("Content-Type", "text/plain")
-        if status_code == 200:
-            self.send_header("Access-Control-Allow-Methods", "POST, OPTIONS")
-            self.send_header("Access-Control-Allow-Headers", "Content-Type")
-        self.end_headers()
+    def send_cors_headers(self, origin, allowed, status_code=200):
+        """Send CORS headers, echoing the origin only if it is allowed"""
+        self.log_request(status_code)
+        self.wfile.write(_CORS_HEADERS[status_code, origin if allowed else None])
 
     def do_OPTIONS(self):
         """Handle OPTIONS preflight requests"""
         origin = self.headers.get("Origin")
-        self.send_cors_headers(origin, 200)
+        self.send_cors_headers(origin, is_origin_allowed(origin), 200)
 
     def do_POST(self):
         """Handle POST requests to the contact form endpoint"""
+        # Unknown paths get a prebuilt, unlogged 404 so scanners stay cheap
         if self.path != ALLOWED_ENDPOINT:
-            self.send_error(404, "Not Found")
+            self.wfile.write(_NOT_FOUND_RESPONSE)
             return
 
+        # Content length validation, before any other header is looked at
+        content_length = self.headers.get("Content-Length", "0")
+        if not (content_length.isascii() and content_length.isdigit()):
+            logger.warning("Invalid Content-Length: %.16r", content_length)
+            origin = self.headers.get("Origin")
+            self.send_cors_headers(origin, is_origin_allowed(origin), 400)
+            self.wfile.write(b"Invalid Content-Length")
+            return
+        if (
+            len(content_length) > len(str(MAX_CONTENT_LENGTH))
+            or int(content_length) > MAX_CONTENT_LENGTH
+        ):
+            logger.warning("Payload too large: %.16s bytes", content_length)
+            origin = self.headers.get("Origin")
+            self.send_cors_headers(origin, is_origin_allowed(origin), 413)
+            self.wfile.write(b"Payload too large")
+            return
+        content_length = int(content_length)
+
         origin = self.headers.get("Origin")
-        logger.info(f"Request from Origin: {origin}")
+        allowed = is_origin_allowed(origin)
+        logger.info("Request from Origin: %s", origin)
 
         # Origin validation
-        if not is_origin_allowed(origin):
-            logger.warning(f"Blocked origin: {origin}")
-            self.send_cors_headers(origin, 403)
+        if not allowed:
+            logger.warning("Blocked origin: %s", origin)
+            self.send_cors_headers(origin, allowed, 403)
             self.wfile.write(b"CORS policy violation")
             return
 
         try:
-            # Content length validation
-            content_length = int(self.headers.get("Content-Length", 0))
-            if content_length > MAX_CONTENT_LENGTH:
-                logger.warning(f"Payload too large: {content_length} bytes")
-                self.send_cors_headers(origin, 413)
-                self.wfile.write(b"Payload too large")
-                return
-
             # JSON parsing
             post_data = self.rfile.read(content_length)
             try:
-                data = json.loads(post_data)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Invalid JSON: {str(e)}")
-                self.send_cors_headers(origin, 400)
+                data = _json.loads(post_data)
+            except ValueError as e:
+                logger.warning("Invalid JSON: %s", e)
+                self.send_cors_headers(origin, allowed, 400)
                 self.wfile.write(b"Invalid JSON format")
                 return
 
@@ -92,16 +368,10 @@ class handler(BaseHTTPRequestHandler):
             recaptcha_token = data.get("g-recaptcha-response")
             if not recaptcha_token:
                 logger.warning("Missing reCAPTCHA token")
-                self.send_cors_headers(origin, 400)
+                self.send_cors_headers(origin, allowed, 400)
                 self.wfile.write(b"Missing reCAPTCHA token")
                 return
 
-            if not self.verify_captcha(recaptcha_token):
-                logger.warning("reCAPTCHA verification failed")
-                self.send_cors_headers(origin, 400)
-                self.wfile.write(b"reCAPTCHA verification failed")
-                return
-
             # Input validation
             name = data.get("name", "").strip()
             email = data.get("email", "").strip()
@@ -109,133 +379,99 @@ class handler(BaseHTTPRequestHandler):
 
             if not all([name, email, message]):
                 logger.warning("Missing required fields")
-                self.send_cors_headers(origin, 400)
+                self.send_cors_headers(origin, allowed, 400)
                 self.wfile.write(b"All fields are required")
                 return
 
-            if not re.match(EMAIL_REGEX, email):
-                logger.warning(f"Invalid email format: {email}")
-                self.send_cors_headers(origin, 400)
+            if not is_valid_email(email):
+                logger.warning("Invalid email format: %s", email)
+                self.send_cors_headers(origin, allowed, 400)
                 self.wfile.write(b"Invalid email format")
                 return
 
-            # Send email
+            # Verify the token while the SMTP connection is being set up
+            smtp_future = _smtp_warmup.submit(_get_smtp)
+            if not self.verify_captcha(recaptcha_token):
+                smtp_future.cancel()
+                logger.warning("reCAPTCHA verification failed")
+                self.send_cors_headers(origin, allowed, 400)
+                self.wfile.write(b"reCAPTCHA verification failed")
+                return
+
+            # Build the email first so bad input fails before any reply is sent,
+            # then send it in the background if enabled and the queue has room
             try:
-                self.send_email(name, email, message)
-                logger.info(f"Email sent: {name} <{email}>")
-                self.send_cors_headers(origin, 200)
-                self.wfile.write(b"Message sent successfully!")
-            except Exception as e:
+                msg = self.build_email(name, email, message)
+                if ASYNC_SEND and _queue_send(_send_message, msg):
+                    logger.info("Email queued: %s <%s>", name, email)
+                    status_code, body = 202, b"Message received!"
+                else:
+                    # A failed or stalled warm-up goes straight to the 500 path
+                    # rather than paying for a second connect and login attempt
+                    _send_message(msg, smtp_future.result(timeout=SMTP_TIMEOUT))
+                    logger.info("Email sent: %s <%s>", name, email)
+                    status_code, body = 200, b"Message sent successfully!"
+            except Exception:
                 logger.exception("Email sending failed")
-                self.send_cors_headers(origin, 500)
-                self.wfile.write(b"Failed to send message")
+                status_code, body = 500, b"Failed to send message"
+            self.send_cors_headers(origin, allowed, status_code)
+            self.wfile.write(body)
 
         except Exception as e:
-            logger.exception(f"Server error: {str(e)}")
-            self.send_cors_headers(origin, 500)
+            logger.exception("Server error: %s", e)
+            self.send_cors_headers(origin, allowed, 500)
             self.wfile.write(b"Internal server error")
 
     def verify_captcha(self, token):
         """Verify reCAPTCHA v2 token"""
-        secret = os.environ.get("RECAPTCHA_SECRET")
-        if not secret:
-            logger.error("RECAPTCHA_SECRET environment variable missing")
-            raise RuntimeError("reCAPTCHA configuration error")
-
         try:
-            response = requests.post(
-                "https://www.google.com/recaptcha/api/siteverify",
-                data={"secret": secret, "response": token},
-                timeout=3,
+            body = urllib.parse.urlencode(
+                {"secret": RECAPTCHA_SECRET, "response": token}
             )
-            response.raise_for_status()
-            result = response.json()
-            logger.debug(f"reCAPTCHA result: {result}")
+            status, data = _post_siteverify(body.encode())
+            if status != 200:
+                raise http.client.HTTPException(f"siteverify returned HTTP {status}")
+            result = _json.loads(data)
+            logger.debug("reCAPTCHA result: %s", result)
 
             if not result.get("success"):
                 error_codes = result.get("error-codes", ["unknown"])
-                logger.warning(f"reCAPTCHA failed: {error_codes}")
+                logger.warning("reCAPTCHA failed: %s", error_codes)
                 return False
 
             return True
-        except (requests.RequestException, ValueError) as e:
-            logger.error(f"reCAPTCHA request failed: {str(e)}")
+        except (http.client.HTTPException, OSError, ValueError) as e:
+            logger.error("reCAPTCHA request failed: %s", e)
             return False
 
-    def send_email(self, name, email, message):
-        """Send formatted email with contact form submission"""
-        logger.info(f"Preparing email for: {name} <{email}>")
-
-        # Validate environment variables
-        required_env = ["EMAIL_FROM", "EMAIL_TO", "EMAIL_PASSWORD"]
-        if missing := [var for var in required_env if not os.environ.get(var)]:
-            logger.error(f"Missing email config: {', '.join(missing)}")
-            raise RuntimeError("Email configuration incomplete")
+    def build_email(self, name, email, message):
+        """Build the formatted email for a contact form submission"""
+        logger.info("Preparing email for: %s <%s>", name, email)
 
         # Create email
         msg = EmailMessage()
         msg["Subject"] = f"New Portfolio Message: {name}"
-        msg["From"] = os.environ["EMAIL_FROM"]
-        msg["To"] = os.environ["EMAIL_TO"]
+        msg["From"] = EMAIL_FROM
+        msg["To"] = EMAIL_TO
         msg["Reply-To"] = formataddr((name, email))  # Secure header formatting
 
         # Create email content
-        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime())
 
         # Plain text version
-        plain_text = f"""\
-        🚀 New Message From Your Portfolio Site
-
-        ⏰ Received at: {timestamp}
-
-        👤 Contact Details:
-          • Name: {name}
-          • Email: {email}
-
-        📝 Message:
-        {textwrap.indent(message.strip(), "    ")}
-
-        ---
-        🤖 Automated Notification - Do not reply directly to this email.
-        """
-        msg.set_content(textwrap.dedent(plain_text))
-
-        # HTML version (properly escaped)
-        safe_message = html.escape(message).replace("\n", "<br>")
-        html_content = f"""\
-        <html>
-          <body>
-            <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-              <h2 style="color: #2563eb;">🚀 New Message From Portfolio Site</h2>
-              <div style="background-color: #f3f4f6; padding: 16px; border-radius: 8px; margin-bottom: 24px;">
-                <p><strong>Received at:</strong> {timestamp}</p>
-                <h3 style="color: #4b5563; margin-top: 20px;">Contact Details</h3>
-                <ul>
-                  <li><strong>Name:</strong> {html.escape(name)}</li>
-                  <li><strong>Email:</strong> <a href="mailto:{html.escape(email)}">{html.escape(email)}</a></li>
-                </ul>
-                <h3 style="color: #4b5563; margin-top: 20px;">📝 Message</h3>
-                <div style="white-space: pre-wrap; background: white; padding: 12px; border-radius: 4px;">
-                  {safe_message}
-                </div>
-              </div>
-              <div style="font-size: 12px; color: #6b7280; text-align: center; padding-top: 16px; border-top: 1px solid #e5e7eb;">
-                <p>🔒 This message was sent securely via your portfolio contact form</p>
-                <p>🤖 Automated Notification - Do not reply directly to this email</p>
-              </div>
-            </div>
-          </body>
-        </html>
-        """
-        msg.add_alternative(textwrap.dedent(html_content), subtype="html")
-
-        # SMTP configuration
-        smtp_server = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.environ.get("SMTP_PORT", 465))
-        smtp_timeout = int(os.environ.get("SMTP_TIMEOUT", 10))
-
-        # Send email
-        with smtplib.SMTP_SSL(smtp_server, smtp_port, timeout=smtp_timeout) as smtp:
-            smtp.login(os.environ["EMAIL_FROM"], os.environ["EMAIL_PASSWORD"])
-            smtp.send_message(msg)
-            logger.info(f"Email successfully sent via {smtp_server}:{smtp_port}")
+        ctx = {
+            "timestamp": timestamp,
+            "name": name,
+            "email": email,
+            "message": "    " + message.strip().replace("\n", "\n    "),
+        }
+        msg.set_content(PLAIN_TEMPLATE.format_map(ctx))
+
+        # HTML version (properly escaped), skipped for short messages
+        if INCLUDE_HTML and len(message) > HTML_MIN_MESSAGE_LENGTH:
+            ctx["safe_name"] = html.escape(name)
+            ctx["safe_email"] = html.escape(email)
+            ctx["safe_message"] = message.translate(HTML_MESSAGE_TABLE)
+            msg.add_alternative(HTML_TEMPLATE.format_map(ctx), subtype="html")
+
+        return msg
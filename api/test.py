@@ -2,9 +2,18 @@
 
 from http.server import BaseHTTPRequestHandler
 
+BODY = b"<h1>Test endpoint is working!</h1>"
+
+# Full response, built once and written with a single call
+RESPONSE = (
+    f"{BaseHTTPRequestHandler.protocol_version} 200 OK\r\n"
+    "Content-Type: text/html\r\n"
+    f"Content-Length: {len(BODY)}\r\n"
+    "\r\n"
+).encode("latin-1") + BODY
+
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.end_headers()
-        self.wfile.write(b"<h1>Test endpoint is working!</h1>")
+        self.log_request(200)
+        self.wfile.write(RESPONSE)